@@ -23,19 +23,16 @@ bl_info = {
 
 from . import ops, props, ui, utils
 
-modules = (
-    props,
-    ops,
-    ui,
-    utils,
-)
-
 
 def register():
-    for module in modules:
-        module.register()
+    props.register()
+    ops.register()
+    ui.register()
+    utils.register()
 
 
 def unregister():
-    for module in reversed(modules):
-        module.unregister()
+    utils.unregister()
+    ui.unregister()
+    ops.unregister()
+    props.unregister()
@@ -1,24 +1,33 @@
+from math import inf
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Union
 
-import bgl
 import bmesh
 import bpy
 import gpu
 import gpu_extras
 from bpy.props import BoolProperty, BoolVectorProperty, FloatProperty, IntProperty, StringProperty
-from bpy.types import (Context, CorrectiveSmoothModifier, Event, NodesModifier, Object, Operator, ShrinkwrapModifier,
-                       SpaceView3D)
-from bpy.utils import register_class, unregister_class
+from bpy.types import (Context, CorrectiveSmoothModifier, Depsgraph, Event, Modifier, NodesModifier, Object, Operator,
+                       ShrinkwrapModifier, SpaceView3D)
+from bpy.utils import register_classes_factory
 from bpy_extras import view3d_utils
 
-from .utils import (MaterialName, ModifierName, ShrinkwrapName, apply_shrinkwrap, clean_shrinkwrap, flip_normals,
-                    get_material, get_mirror_modifier, get_modifier, remove_modifiers, row_with_heading, set_materials,
+from .utils import (MaterialName, ModifierName, ShrinkwrapName, apply_shrinkwrap, clean_shrinkwrap, ensure_modifiers,
+                    flip_normals, get_material, get_mirror_modifier, remove_modifiers, row_with_heading, set_materials,
                     setup_shrinkwrap, sort_modifiers)
 
 if TYPE_CHECKING:
     from .props import RetopoMatSettings
 
+_RETOPO_MODIFIER_NAMES = frozenset(name.value for name in ModifierName)
+_POLY_STRIP_BLEND = Path(__file__).parent.joinpath('poly_strip.blend').as_posix()
+
+
+def _poll_mesh_object(context: Context, mode: str = None) -> bool:
+    '''Check whether the active object is a mesh, optionally in the given mode.'''
+    object: Object = context.active_object
+    return (object is not None) and (object.type == 'MESH') and ((mode is None) or (object.mode == mode))
+
 
 class AddReferenceMaterialOperator(Operator):
     bl_idname = 'retopomat.add_reference_material'
@@ -31,8 +40,7 @@ class AddReferenceMaterialOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH') and (object.mode == 'OBJECT')
+        return _poll_mesh_object(context, 'OBJECT')
 
     def execute(self, context: Context) -> set:
         object: Object = context.active_object
@@ -52,8 +60,7 @@ class AddRetopoMaterialsOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH') and (object.mode == 'OBJECT')
+        return _poll_mesh_object(context, 'OBJECT')
 
     def execute(self, context: Context) -> set:
         object: Object = context.active_object
@@ -61,9 +68,7 @@ class AddRetopoMaterialsOperator(Operator):
         wireframe_material = get_material(object, MaterialName.WIREFRAME, create=True)
         set_materials(object, [retopo_material, wireframe_material])
 
-        get_modifier(object, ModifierName.DISPLACE, create=True)
-        get_modifier(object, ModifierName.SOLIDIFY, create=True)
-        get_modifier(object, ModifierName.WIREFRAME, create=True)
+        ensure_modifiers(object, [ModifierName.DISPLACE, ModifierName.SOLIDIFY, ModifierName.WIREFRAME])
 
         self.report({'INFO'}, 'Added retopo material')
         return {'FINISHED'}
@@ -77,8 +82,7 @@ class RemoveMaterialsOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH') and (object.mode == 'OBJECT')
+        return _poll_mesh_object(context, 'OBJECT')
 
     def execute(self, context: Context) -> set:
         object: Object = context.active_object
@@ -98,7 +102,7 @@ class SortModifiersOperator(Operator):
     @classmethod
     def poll(cls, context: Context) -> bool:
         object: Object = context.active_object
-        return any(get_modifier(object, name) for name in ModifierName)
+        return (object is not None) and not _RETOPO_MODIFIER_NAMES.isdisjoint(object.modifiers.keys())
 
     def execute(self, context: Context) -> set:
         object: Object = context.active_object
@@ -142,6 +146,10 @@ class MirrorModifierOperator(Operator):
         # Don't accept invalid names and don't use self as mirror.
         if (mirror_object is None) or (mirror_object is object):
             self['mirror_object'] = ''
+            mirror_object = None
+
+        # Cache the resolved object so execute doesn't repeat the lookup.
+        self._mirror_object = mirror_object
 
     mirror_object: StringProperty(
         name='Mirror Object',
@@ -168,16 +176,19 @@ class MirrorModifierOperator(Operator):
         layout.use_property_decorate = False
 
         row = row_with_heading(layout, heading='Axis', align=True)
-        for index, axis in enumerate('XYZ'):
-            row.prop(self, 'use_axis', index=index, text=axis, toggle=1)
+        row.prop(self, 'use_axis', index=0, text='X', toggle=1)
+        row.prop(self, 'use_axis', index=1, text='Y', toggle=1)
+        row.prop(self, 'use_axis', index=2, text='Z', toggle=1)
 
         row = row_with_heading(layout, heading='Bisect', align=True)
-        for index, axis in enumerate('XYZ'):
-            row.prop(self, 'use_bisect_axis', index=index, text=axis, toggle=1)
+        row.prop(self, 'use_bisect_axis', index=0, text='X', toggle=1)
+        row.prop(self, 'use_bisect_axis', index=1, text='Y', toggle=1)
+        row.prop(self, 'use_bisect_axis', index=2, text='Z', toggle=1)
 
         row = row_with_heading(layout, heading='Flip', align=True)
-        for index, axis in enumerate('XYZ'):
-            row.prop(self, 'use_bisect_flip_axis', index=index, text=axis, toggle=1)
+        row.prop(self, 'use_bisect_flip_axis', index=0, text='X', toggle=1)
+        row.prop(self, 'use_bisect_flip_axis', index=1, text='Y', toggle=1)
+        row.prop(self, 'use_bisect_flip_axis', index=2, text='Z', toggle=1)
 
         layout.separator()
 
@@ -187,18 +198,20 @@ class MirrorModifierOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH')
+        return _poll_mesh_object(context)
 
     def invoke(self, context: Context, event: Event) -> set:
         object: Object = context.active_object
         modifier = get_mirror_modifier(object)
 
         if modifier is not None:
-            # Copy settings from the existing modifier.
+            # Copy settings from the existing modifier. Vectors are copied whole rather than per element.
             self.mirror_object = modifier.mirror_object.name if (modifier.mirror_object is not None) else ''
-            for key in ('use_axis', 'use_bisect_axis', 'use_bisect_flip_axis', 'use_clip', 'use_mirror_merge'):
-                setattr(self, key, getattr(modifier, key))
+            self.use_axis = tuple(modifier.use_axis)
+            self.use_bisect_axis = tuple(modifier.use_bisect_axis)
+            self.use_bisect_flip_axis = tuple(modifier.use_bisect_flip_axis)
+            self.use_clip = modifier.use_clip
+            self.use_mirror_merge = modifier.use_mirror_merge
 
         else:
             # Use the reference object as default mirror object.
@@ -216,10 +229,15 @@ class MirrorModifierOperator(Operator):
         object: Object = context.active_object
         modifier = get_mirror_modifier(object, create=True)
 
-        # Copy our settings to the modifier.
-        modifier.mirror_object = bpy.data.objects.get(self.mirror_object)
-        for key in ('use_axis', 'use_bisect_axis', 'use_bisect_flip_axis', 'use_clip', 'use_mirror_merge'):
-            setattr(modifier, key, getattr(self, key))
+        # Copy our settings to the modifier. Vectors are copied whole rather than per element.
+        if not hasattr(self, '_mirror_object'):
+            self._mirror_object = bpy.data.objects.get(self.mirror_object)
+        modifier.mirror_object = self._mirror_object
+        modifier.use_axis = tuple(self.use_axis)
+        modifier.use_bisect_axis = tuple(self.use_bisect_axis)
+        modifier.use_bisect_flip_axis = tuple(self.use_bisect_flip_axis)
+        modifier.use_clip = self.use_clip
+        modifier.use_mirror_merge = self.use_mirror_merge
 
         return {'FINISHED'}
 
@@ -230,9 +248,18 @@ class QuickShrinkwrapOperator(Operator):
     bl_description = 'Use shrinkwrap and corrective smooth modifiers'
     bl_options = {'INTERNAL', 'UNDO'}  # Not using REGISTER because I don't want a redo panel.
 
+    def _get_shrinkwrap_modifier(self, context: Context, name: str) -> Union[Modifier, None]:
+        '''Get one of our modifiers, preferring the cache built in invoke.'''
+        modifiers = getattr(self, '_modifiers', None)
+        if modifiers is not None:
+            return modifiers.get(name)
+
+        object: Object = context.active_object
+        return object.modifiers.get(name) if (object is not None) else None
+
     def _update_target(self, context: Context):
         object: Object = context.active_object
-        target = bpy.data.objects.get(self.target)
+        target = context.scene.objects.get(self.target)
 
         # Prevent the shrinkwrap from targeting itself.
         if target is object:
@@ -243,12 +270,14 @@ class QuickShrinkwrapOperator(Operator):
             self['target'] = ''
 
         # Set the target on the first shrinkwrap modifier.
-        shrinkwrap_tangent: ShrinkwrapModifier = object.modifiers.get(ShrinkwrapName.SHRINKWRAP_TANGENT)
+        shrinkwrap_tangent: ShrinkwrapModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.SHRINKWRAP_TANGENT)
         if shrinkwrap_tangent is not None:
             shrinkwrap_tangent.target = target
 
         # Set the target on the second shrinkwrap modifier.
-        shrinkwrap_nearest: ShrinkwrapModifier = object.modifiers.get(ShrinkwrapName.SHRINKWRAP_NEAREST)
+        shrinkwrap_nearest: ShrinkwrapModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.SHRINKWRAP_NEAREST)
         if shrinkwrap_nearest is not None:
             shrinkwrap_nearest.target = target
 
@@ -260,8 +289,8 @@ class QuickShrinkwrapOperator(Operator):
     )
 
     def _update_offset_tangent(self, context: Context):
-        object: Object = context.active_object
-        shrinkwrap_tangent: ShrinkwrapModifier = object.modifiers.get(ShrinkwrapName.SHRINKWRAP_TANGENT)
+        shrinkwrap_tangent: ShrinkwrapModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.SHRINKWRAP_TANGENT)
         if shrinkwrap_tangent is not None:
             shrinkwrap_tangent.offset = self.offset_tangent
 
@@ -278,8 +307,8 @@ class QuickShrinkwrapOperator(Operator):
     )
 
     def _update_offset_nearest(self, context: Context):
-        object: Object = context.active_object
-        shrinkwrap_nearest: ShrinkwrapModifier = object.modifiers.get(ShrinkwrapName.SHRINKWRAP_NEAREST)
+        shrinkwrap_nearest: ShrinkwrapModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.SHRINKWRAP_NEAREST)
         if shrinkwrap_nearest is not None:
             shrinkwrap_nearest.offset = self.offset_nearest
 
@@ -296,8 +325,8 @@ class QuickShrinkwrapOperator(Operator):
     )
 
     def _update_factor(self, context: Context):
-        object: Object = context.active_object
-        corrective_smooth: CorrectiveSmoothModifier = object.modifiers.get(ShrinkwrapName.CORRECTIVE_SMOOTH)
+        corrective_smooth: CorrectiveSmoothModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.CORRECTIVE_SMOOTH)
         if corrective_smooth is not None:
             corrective_smooth.factor = self.factor
 
@@ -314,8 +343,8 @@ class QuickShrinkwrapOperator(Operator):
     )
 
     def _update_iterations(self, context: Context):
-        object: Object = context.active_object
-        corrective_smooth: CorrectiveSmoothModifier = object.modifiers.get(ShrinkwrapName.CORRECTIVE_SMOOTH)
+        corrective_smooth: CorrectiveSmoothModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.CORRECTIVE_SMOOTH)
         if corrective_smooth is not None:
             corrective_smooth.iterations = self.iterations
 
@@ -330,8 +359,8 @@ class QuickShrinkwrapOperator(Operator):
     )
 
     def _update_scale(self, context: Context):
-        object: Object = context.active_object
-        smooth_modifier: CorrectiveSmoothModifier = object.modifiers.get(ShrinkwrapName.CORRECTIVE_SMOOTH)
+        smooth_modifier: CorrectiveSmoothModifier = self._get_shrinkwrap_modifier(
+            context, ShrinkwrapName.CORRECTIVE_SMOOTH)
         if smooth_modifier is not None:
             smooth_modifier.scale = self.scale
 
@@ -354,7 +383,7 @@ class QuickShrinkwrapOperator(Operator):
 
         sub = layout.column()
         sub.alert = (not self.target)
-        sub.prop_search(self, 'target', search_data=bpy.data, search_property='objects')
+        sub.prop_search(self, 'target', search_data=context.scene, search_property='objects')
 
         sub = layout.column()
         sub.enabled = bool(self.target)
@@ -369,13 +398,15 @@ class QuickShrinkwrapOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH')
+        return _poll_mesh_object(context)
 
     def invoke(self, context: 'Context', event: Event) -> set:
         object: Object = context.active_object
         setup_shrinkwrap(object)
 
+        # Cache our modifiers so the update callbacks don't search the stack.
+        self._modifiers = {name: object.modifiers.get(name) for name in ShrinkwrapName.modifiers()}
+
         # Use the reference object as default shrinkwrap target.
         settings: 'RetopoMatSettings' = context.scene.retopomat
         reference_object = settings.reference_object
@@ -396,6 +427,9 @@ class QuickShrinkwrapOperator(Operator):
         object: Object = bpy.context.active_object
         clean_shrinkwrap(object)
 
+        # The cached modifiers were just removed, so drop them.
+        self._modifiers = None
+
 
 class FlipNormalsOperator(Operator):
     bl_idname = 'retopomat.flip_normals'
@@ -405,8 +439,7 @@ class FlipNormalsOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH')
+        return _poll_mesh_object(context)
 
     def execute(self, context: Context) -> set:
         object: Object = context.active_object
@@ -449,19 +482,45 @@ class PolyStripOperator(Operator):
 
     @classmethod
     def poll(cls, context: Context) -> bool:
-        object: Object = context.active_object
-        return (object is not None) and (object.type == 'MESH') and (object.mode == 'EDIT')
+        return _poll_mesh_object(context, 'EDIT')
 
     def invoke(self, context: Context, event: Event) -> set:
         self.object = None
         self.points = []
 
-        self.draw_handler = SpaceView3D.draw_handler_add(self.draw_callback, (context,), 'WINDOW', 'POST_VIEW')
+        self.draw_handler = None
         self.lines = []
+        self.shader = gpu.shader.from_builtin('3D_UNIFORM_COLOR')
+        self.batch = None
+        self.last_coords = (-10, -10)
 
         context.window_manager.modal_handler_add(self)
         return {'RUNNING_MODAL'}
 
+    def _pick_object(self, context: Context, depsgraph: Depsgraph, ray_origin, view_vector) -> Union[Object, None]:
+        '''Find the closest mesh object under the cursor, ignoring the active object.'''
+        active_object: Object = context.active_object
+        closest_object = None
+        closest_distance = inf
+
+        # Casting against each object directly avoids hiding the active object, which would tag the depsgraph.
+        for object in context.visible_objects:
+            if (object is active_object) or (object.type != 'MESH'):
+                continue
+
+            matrix_inv = object.matrix_world.inverted_safe()
+            ray_origin_obj = matrix_inv @ ray_origin
+            ray_direction_obj = matrix_inv.to_3x3() @ view_vector
+
+            result, location, _, _ = object.ray_cast(ray_origin_obj, ray_direction_obj, depsgraph=depsgraph)
+            if result:
+                distance = (object.matrix_world @ location - ray_origin).length_squared
+                if distance < closest_distance:
+                    closest_distance = distance
+                    closest_object = object
+
+        return closest_object
+
     def modal(self, context: Context, event: Event) -> set:
         context.window.cursor_modal_set('PAINT_BRUSH')
 
@@ -470,44 +529,59 @@ class PolyStripOperator(Operator):
             ray_origin = view3d_utils.region_2d_to_origin_3d(context.region, context.region_data, coords)
             view_vector = view3d_utils.region_2d_to_vector_3d(context.region, context.region_data, coords)
 
-            context.active_object.hide_set(True)
             depsgraph = context.evaluated_depsgraph_get()
-            results = context.scene.ray_cast(depsgraph, ray_origin, view_vector)
-            context.active_object.hide_set(False)
-
-            result, _, _, _, object, _ = results
-            if not result:
+            object = self._pick_object(context, depsgraph, ray_origin, view_vector)
+            if object is None:
                 return {'RUNNING_MODAL'}
 
             self.object: Object = object
+            self.depsgraph = depsgraph
+
+            # The target doesn't move during the stroke, so cache its matrices.
+            self.matrix_world = object.matrix_world.copy()
+            self.matrix_inv = self.matrix_world.inverted_safe()
+            self.matrix_inv_3x3 = self.matrix_inv.to_3x3()
+
+            # Only start drawing once there is something to draw.
+            if self.draw_handler is None:
+                self.draw_handler = SpaceView3D.draw_handler_add(self.draw_callback, (context,), 'WINDOW', 'POST_VIEW')
+
             return {'RUNNING_MODAL'}
 
         if event.type in ('RIGHTMOUSE', 'ESC'):
+            if self.draw_handler is not None:
+                self.draw_handler = SpaceView3D.draw_handler_remove(self.draw_handler, 'WINDOW')
+
             context.window.cursor_modal_restore()
             return {'CANCELLED'}
 
         if self.object:
             if event.type == 'MOUSEMOVE':
                 coords = event.mouse_region_x, event.mouse_region_y
+
+                # Skip near-duplicate samples, so high-polling mice don't flood the ray cast and redraw.
+                delta_x = coords[0] - self.last_coords[0]
+                delta_y = coords[1] - self.last_coords[1]
+                if (delta_x * delta_x + delta_y * delta_y) < 4:
+                    return {'RUNNING_MODAL'}
+                self.last_coords = coords
+
                 ray_origin = view3d_utils.region_2d_to_origin_3d(context.region, context.region_data, coords)
                 view_vector = view3d_utils.region_2d_to_vector_3d(context.region, context.region_data, coords)
-                ray_target = ray_origin + view_vector
 
-                matrix_inv = self.object.matrix_world.inverted_safe()
-                ray_origin_obj = matrix_inv @ ray_origin
-                ray_target_obj = matrix_inv @ ray_target
-                ray_direction_obj = ray_target_obj - ray_origin_obj
+                ray_origin_obj = self.matrix_inv @ ray_origin
+                ray_direction_obj = self.matrix_inv_3x3 @ view_vector
 
-                depsgraph = context.evaluated_depsgraph_get()
-                results = self.object.ray_cast(ray_origin_obj, ray_direction_obj, depsgraph=depsgraph)
+                results = self.object.ray_cast(ray_origin_obj, ray_direction_obj, depsgraph=self.depsgraph)
 
                 result, location, _, _ = results
                 if not result:
                     return {'RUNNING_MODAL'}
 
-                self.points.append(self.object.matrix_world @ location)
+                self.points.append((self.matrix_world @ location).to_tuple())
                 if len(self.points) > 1:
                     self.lines.extend(self.points[-2:])
+                    self.batch = gpu_extras.batch.batch_for_shader(self.shader, 'LINES', {'pos': self.lines})
 
                 context.area.tag_redraw()
                 return {'RUNNING_MODAL'}
@@ -528,63 +602,58 @@ class PolyStripOperator(Operator):
 
         spline = curve_data.splines.new('POLY')
         spline.points.add(len(self.points) - 1)
-        for index in range(len(self.points)):
-            spline.points[index].co[:3] = self.points[index][:3]
+        coordinates = [value for point in self.points for value in (*point, 1.0)]
+        spline.points.foreach_set('co', coordinates)
 
         if 'Poly Strip' not in bpy.data.node_groups:
-            path = Path(__file__).parent.joinpath('poly_strip.blend').as_posix()
-            with bpy.data.libraries.load(path) as (data_from, data_to):
+            with bpy.data.libraries.load(_POLY_STRIP_BLEND) as (data_from, data_to):
                 data_to.node_groups.append('Poly Strip')
 
         node_group = bpy.data.node_groups['Poly Strip']
         modifier: NodesModifier = curve_object.modifiers.new('Poly Strip', 'NODES')
         modifier.node_group = node_group
 
-        values = [self.object, self.cross, self.follow, self.width]
-        for key in modifier.keys():
-            if key.startswith('Input_') and key.endswith(tuple('0123456789')):
-                modifier[key] = values.pop(0)
+        # Assign by socket identifier instead of scanning the modifier's custom properties.
+        sockets = [socket for socket in node_group.inputs if socket.type != 'GEOMETRY']
+        values = (self.object, self.cross, self.follow, self.width)
+        for socket, value in zip(sockets, values):
+            modifier[socket.identifier] = value
 
         depsgraph = context.evaluated_depsgraph_get()
         curve_evaluated = bpy.data.meshes.new_from_object(
             object=curve_object.evaluated_get(depsgraph),
-            preserve_all_data_layers=True,
             depsgraph=depsgraph,
         )
 
-        matrix_inv = context.active_object.matrix_world.inverted_safe()
+        object: Object = context.active_object
+        matrix_inv = object.matrix_world.inverted_safe()
         curve_evaluated.transform(matrix_inv)
 
-        bm = bmesh.from_edit_mesh(context.active_object.data)
+        bm = bmesh.from_edit_mesh(object.data)
         bm.from_mesh(curve_evaluated)
-        bmesh.update_edit_mesh(context.active_object.data)
+        bmesh.update_edit_mesh(object.data)
 
         bpy.data.meshes.remove(curve_evaluated)
         bpy.data.objects.remove(curve_object)
         bpy.data.curves.remove(curve_data)
 
-        if not node_group.users:
-            bpy.data.node_groups.remove(node_group)
-
         return {'FINISHED'}
 
     def draw_callback(self, context: Context):
-        scale = context.preferences.view.ui_scale
+        if self.batch is None:
+            return
 
-        bgl.glEnable(bgl.GL_BLEND)
-        bgl.glEnable(bgl.GL_LINE_SMOOTH)
-        bgl.glLineWidth(2 * scale)
+        scale = context.preferences.view.ui_scale
 
-        shader = gpu.shader.from_builtin('3D_UNIFORM_COLOR')
-        shader.bind()
-        shader.uniform_float('color', (1.0, 1.0, 1.0, 1.0))
+        gpu.state.blend_set('ALPHA')
+        gpu.state.line_width_set(2 * scale)
 
-        batch = gpu_extras.batch.batch_for_shader(shader, 'LINES', {'pos': self.lines})
-        batch.draw(shader)
+        self.shader.bind()
+        self.shader.uniform_float('color', (1.0, 1.0, 1.0, 1.0))
+        self.batch.draw(self.shader)
 
-        bgl.glLineWidth(1)
-        bgl.glDisable(bgl.GL_LINE_SMOOTH)
-        bgl.glDisable(bgl.GL_BLEND)
+        gpu.state.line_width_set(1.0)
+        gpu.state.blend_set('NONE')
 
 
 classes = (
@@ -599,11 +668,17 @@ classes = (
 )
 
 
+_register_classes, _unregister_classes = register_classes_factory(classes)
+
+
 def register():
-    for cls in classes:
-        register_class(cls)
+    _register_classes()
 
 
 def unregister():
-    for cls in reversed(classes):
-        unregister_class(cls)
+    _unregister_classes()
+
+    # Remove the node group we kept around for repeated poly strip strokes.
+    node_group = bpy.data.node_groups.get('Poly Strip')
+    if (node_group is not None) and (not node_group.users):
+        bpy.data.node_groups.remove(node_group)
@@ -1,22 +1,125 @@
-from typing import Any, Union
+from typing import Any, Callable, Dict, Tuple, Union
 
 import bpy
 from bpy.props import BoolProperty, FloatProperty, FloatVectorProperty, PointerProperty, StringProperty
 from bpy.types import Object, PropertyGroup, Scene
-from bpy.utils import register_class, unregister_class
+from bpy.utils import register_classes_factory
 
-from .utils import MaterialName, ModifierName, get_material, get_modifier
+from .utils import (MaterialName, ModifierName, get_material, get_modifier, get_node, get_node_input,
+                    get_panel_object)
+
+
+# Property defaults never change after registration, so resolve each one through RNA only once.
+_defaults: Dict[str, Any] = {}
+
+_REFERENCE_COLOR_DEFAULT = (0.2, 0.2, 0.2, 0.8)
+_RETOPO_COLOR_DEFAULT = (0.3, 0.6, 0.9, 0.2)
+
+
+def _blend_accessors(names: Tuple[MaterialName, ...], key: str) -> Tuple[Callable, Callable]:
+    '''Create a getter and setter pair for a material blend property.'''
+
+    def getter(self) -> bool:
+        object: Object = get_panel_object()
+        material = get_material(object, names[0])
+
+        if material is not None:
+            return material.blend_method != 'OPAQUE'
+
+        return self.get_internal(key)
+
+    def setter(self, value: bool):
+        object: Object = get_panel_object()
+        blend_method = 'BLEND' if value else 'OPAQUE'
+
+        for name in names:
+            material = get_material(object, name)
+
+            # Only write when the value changed, to avoid needless updates.
+            if (material is not None) and (material.blend_method != blend_method):
+                material.blend_method = blend_method
+
+        self.set_internal(key, value)
+
+    return getter, setter
+
+
+def _color_accessors(name: MaterialName, key: str) -> Tuple[Callable, Callable]:
+    '''Create a getter and setter pair for a material color property.'''
+
+    def getter(self) -> tuple:
+        object: Object = get_panel_object()
+        material = get_material(object, name)
+
+        # The node can be missing from a material we matched by name but didn't create.
+        node = get_node(material, 'Principled BSDF') if (material is not None) else None
+
+        if node is not None:
+            color = get_node_input(node, 'Base Color').default_value
+            alpha = get_node_input(node, 'Alpha').default_value
+            return (color[0], color[1], color[2], alpha)
+
+        return self.get_internal(key)
+
+    def setter(self, value: tuple):
+        object: Object = get_panel_object()
+        material = get_material(object, name)
+
+        node = get_node(material, 'Principled BSDF') if (material is not None) else None
+
+        if node is not None:
+            color_input = get_node_input(node, 'Base Color')
+            alpha_input = get_node_input(node, 'Alpha')
+
+            # Only write changed sockets; the color socket is RGBA but its alpha is unused,
+            # so the value can go in unchanged.
+            if tuple(color_input.default_value) != tuple(value):
+                color_input.default_value = value
+            if alpha_input.default_value != value[3]:
+                alpha_input.default_value = value[3]
+
+        self.set_internal(key, value)
+
+    return getter, setter
+
+
+def _modifier_accessors(name: ModifierName, key: str, attribute: str) -> Tuple[Callable, Callable]:
+    '''Create a getter and setter pair for a modifier attribute property.'''
+
+    def getter(self):
+        object: Object = get_panel_object()
+        modifier = get_modifier(object, name)
+
+        if modifier is not None:
+            return getattr(modifier, attribute)
+
+        return self.get_internal(key)
+
+    def setter(self, value):
+        object: Object = get_panel_object()
+        modifier = get_modifier(object, name)
+
+        # Only write when the value changed, because every write invalidates the depsgraph.
+        if (modifier is not None) and (getattr(modifier, attribute) != value):
+            setattr(modifier, attribute, value)
+
+        self.set_internal(key, value)
+
+    return getter, setter
 
 
 class RetopoMatSettings(PropertyGroup):
 
     def get_default(self, key: str) -> Any:
-        property = self.bl_rna.properties[key]
+        if key not in _defaults:
+            property = self.bl_rna.properties[key]
 
-        if property.is_array:
-            return property.default_array
-        else:
-            return property.default
+            if property.is_array:
+                _defaults[key] = tuple(property.default_array)
+            else:
+                _defaults[key] = property.default
+
+        return _defaults[key]
 
     def get_internal(self, key: str) -> Any:
         return self.get(key, self.get_default(key))
@@ -52,23 +155,7 @@ class RetopoMatSettings(PropertyGroup):
     def retopo_object(self, object: Object):
         self.retopo_object_name = object.name
 
-    def _get_reference_blend(self) -> bool:
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.REFERENCE)
-
-        if material is not None:
-            return material.blend_method != 'OPAQUE'
-
-        return self.get_internal('reference_blend')
-
-    def _set_reference_blend(self, value: bool):
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.REFERENCE)
-
-        if material is not None:
-            material.blend_method = 'BLEND' if value else 'OPAQUE'
-
-        self.set_internal('reference_blend', value)
+    _get_reference_blend, _set_reference_blend = _blend_accessors((MaterialName.REFERENCE,), 'reference_blend')
 
     reference_blend: BoolProperty(
         name='Reference Blend',
@@ -78,61 +165,22 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_reference_blend,
     )
 
-    def _get_reference_color(self) -> tuple:
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.REFERENCE)
-
-        if material is not None:
-            node = material.node_tree.nodes['Principled BSDF']
-            color = node.inputs['Base Color'].default_value[:3]
-            alpha = node.inputs['Alpha'].default_value
-            return color + (alpha,)
-
-        return self.get_internal('reference_color')
-
-    def _set_reference_color(self, value: tuple):
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.REFERENCE)
-
-        if material is not None:
-            node = material.node_tree.nodes['Principled BSDF']
-            node.inputs['Base Color'].default_value = value[:3] + (1.0,)
-            node.inputs['Alpha'].default_value = value[3]
-
-        self.set_internal('reference_color', value)
+    _get_reference_color, _set_reference_color = _color_accessors(MaterialName.REFERENCE, 'reference_color')
 
     reference_color: FloatVectorProperty(
         name='Reference Color',
         description='Color and opacity of the reference material',
         subtype='COLOR',
         size=4,
-        default=(0.2, 0.2, 0.2, 0.8),
+        default=_REFERENCE_COLOR_DEFAULT,
         min=0.0,
         max=1.0,
         get=_get_reference_color,
         set=_set_reference_color,
     )
 
-    def _get_retopo_blend(self) -> bool:
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.RETOPO)
-
-        if material is not None:
-            return material.blend_method != 'OPAQUE'
-
-        return self.get_internal('retopo_blend')
-
-    def _set_retopo_blend(self, value: bool):
-        object: Object = bpy.context.active_object
-        retopo_material = get_material(object, MaterialName.RETOPO)
-        wireframe_material = get_material(object, MaterialName.WIREFRAME)
-
-        if retopo_material is not None:
-            retopo_material.blend_method = 'BLEND' if value else 'OPAQUE'
-        if wireframe_material is not None:
-            wireframe_material.blend_method = 'BLEND' if value else 'OPAQUE'
-
-        self.set_internal('retopo_blend', value)
+    _get_retopo_blend, _set_retopo_blend = _blend_accessors((MaterialName.RETOPO, MaterialName.WIREFRAME),
+                                                            'retopo_blend')
 
     retopo_blend: BoolProperty(
         name='Retopo Blend',
@@ -142,58 +190,22 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_retopo_blend,
     )
 
-    def _get_retopo_color(self) -> tuple:
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.RETOPO)
-
-        if material is not None:
-            node = material.node_tree.nodes['Principled BSDF']
-            color = node.inputs['Base Color'].default_value[:3]
-            alpha = node.inputs['Alpha'].default_value
-            return color + (alpha,)
-
-        return self.get_internal('retopo_color')
-
-    def _set_retopo_color(self, value: tuple):
-        object: Object = bpy.context.active_object
-        material = get_material(object, MaterialName.RETOPO)
-
-        if material is not None:
-            node = material.node_tree.nodes['Principled BSDF']
-            node.inputs['Base Color'].default_value = value[:3] + (1.0,)
-            node.inputs['Alpha'].default_value = value[3]
-
-        self.set_internal('retopo_color', value)
+    _get_retopo_color, _set_retopo_color = _color_accessors(MaterialName.RETOPO, 'retopo_color')
 
     retopo_color: FloatVectorProperty(
         name='Retopo Color',
         description='Color and opacity of the retopo material',
         subtype='COLOR',
         size=4,
-        default=(0.3, 0.6, 0.9, 0.2),
+        default=_RETOPO_COLOR_DEFAULT,
         min=0.0,
         max=1.0,
         get=_get_retopo_color,
         set=_set_retopo_color,
     )
 
-    def _get_displace_visibility(self) -> bool:
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.DISPLACE)
-
-        if modifier is not None:
-            return modifier.show_viewport
-
-        return self.get_internal('displace_visibility')
-
-    def _set_displace_visibility(self, value: bool):
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.DISPLACE)
-
-        if modifier is not None:
-            modifier.show_viewport = value
-
-        self.set_internal('displace_visibility', value)
+    _get_displace_visibility, _set_displace_visibility = _modifier_accessors(ModifierName.DISPLACE,
+                                                                             'displace_visibility', 'show_viewport')
 
     displace_visibility: BoolProperty(
         name='Displace Visibility',
@@ -203,23 +215,8 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_displace_visibility,
     )
 
-    def _get_displace_strength(self) -> float:
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.DISPLACE)
-
-        if modifier is not None:
-            return modifier.strength
-
-        return self.get_internal('displace_strength')
-
-    def _set_displace_strength(self, value: float):
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.DISPLACE)
-
-        if modifier is not None:
-            modifier.strength = value
-
-        self.set_internal('displace_strength', value)
+    _get_displace_strength, _set_displace_strength = _modifier_accessors(ModifierName.DISPLACE,
+                                                                         'displace_strength', 'strength')
 
     displace_strength: FloatProperty(
         name='Displace Strength',
@@ -234,23 +231,8 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_displace_strength,
     )
 
-    def _get_solidify_visibility(self) -> bool:
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.SOLIDIFY)
-
-        if modifier is not None:
-            return modifier.show_viewport
-
-        return self.get_internal('solidify_visibility')
-
-    def _set_solidify_visibility(self, value: bool):
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.SOLIDIFY)
-
-        if modifier is not None:
-            modifier.show_viewport = value
-
-        self.set_internal('solidify_visibility', value)
+    _get_solidify_visibility, _set_solidify_visibility = _modifier_accessors(ModifierName.SOLIDIFY,
+                                                                             'solidify_visibility', 'show_viewport')
 
     solidify_visibility: BoolProperty(
         name='Solidify Visibility',
@@ -260,23 +242,8 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_solidify_visibility,
     )
 
-    def _get_solidify_thickness(self) -> float:
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.SOLIDIFY)
-
-        if modifier is not None:
-            return modifier.thickness
-
-        return self.get_internal('solidify_thickness')
-
-    def _set_solidify_thickness(self, value: float):
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.SOLIDIFY)
-
-        if modifier is not None:
-            modifier.thickness = value
-
-        self.set_internal('solidify_thickness', value)
+    _get_solidify_thickness, _set_solidify_thickness = _modifier_accessors(ModifierName.SOLIDIFY,
+                                                                           'solidify_thickness', 'thickness')
 
     solidify_thickness: FloatProperty(
         name='Solidify Thickness',
@@ -291,23 +258,8 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_solidify_thickness,
     )
 
-    def _get_wireframe_visibility(self) -> bool:
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.WIREFRAME)
-
-        if modifier is not None:
-            return modifier.show_viewport
-
-        return self.get_internal('wireframe_visibility')
-
-    def _set_wireframe_visibility(self, value: bool):
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.WIREFRAME)
-
-        if modifier is not None:
-            modifier.show_viewport = value
-
-        self.set_internal('wireframe_visibility', value)
+    _get_wireframe_visibility, _set_wireframe_visibility = _modifier_accessors(ModifierName.WIREFRAME,
+                                                                               'wireframe_visibility', 'show_viewport')
 
     wireframe_visibility: BoolProperty(
         name='Wireframe Visibility',
@@ -317,23 +269,8 @@ class RetopoMatSettings(PropertyGroup):
         set=_set_wireframe_visibility,
     )
 
-    def _get_wireframe_thickness(self) -> float:
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.WIREFRAME)
-
-        if modifier is not None:
-            return modifier.thickness
-
-        return self.get_internal('wireframe_thickness')
-
-    def _set_wireframe_thickness(self, value: float):
-        object: Object = bpy.context.active_object
-        modifier = get_modifier(object, ModifierName.WIREFRAME)
-
-        if modifier is not None:
-            modifier.thickness = value
-
-        self.set_internal('wireframe_thickness', value)
+    _get_wireframe_thickness, _set_wireframe_thickness = _modifier_accessors(ModifierName.WIREFRAME,
+                                                                             'wireframe_thickness', 'thickness')
 
     wireframe_thickness: FloatProperty(
         name='Wireframe Thickness',
@@ -351,10 +288,11 @@ class RetopoMatSettings(PropertyGroup):
 
 classes = (RetopoMatSettings,)
 
+_register_classes, _unregister_classes = register_classes_factory(classes)
+
 
 def register():
-    for cls in classes:
-        register_class(cls)
+    _register_classes()
 
     Scene.retopomat = PointerProperty(type=RetopoMatSettings)
 
@@ -362,5 +300,4 @@ def register():
 def unregister():
     del Scene.retopomat
 
-    for cls in reversed(classes):
-        unregister_class(cls)
+    _unregister_classes()
@@ -1,15 +1,46 @@
 from typing import TYPE_CHECKING
 
 from bpy.types import Context, Object, Panel, Theme, UILayout
-from bpy.utils import register_class, unregister_class
+from bpy.utils import register_classes_factory
 
 from .ops import (AddReferenceMaterialOperator, AddRetopoMaterialsOperator, FlipNormalsOperator, MirrorModifierOperator,
                   PolyStripOperator, QuickShrinkwrapOperator, RemoveMaterialsOperator, SortModifiersOperator)
-from .utils import MaterialName, ModifierName, get_material, get_modifier
+from .utils import MaterialName, ModifierName, get_material, get_modifier, set_panel_object
 
 if TYPE_CHECKING:
     from .props import RetopoMatSettings
 
+# Settings rows as (value property, label, toggle property, material or modifier name).
+_material_rows = (
+    ('reference_color', 'Reference', 'reference_blend', MaterialName.REFERENCE),
+    ('retopo_color', 'Retopo', 'retopo_blend', MaterialName.RETOPO),
+)
+
+_modifier_rows = (
+    ('displace_strength', 'Offset', 'displace_visibility', ModifierName.DISPLACE),
+    ('solidify_thickness', 'Thickness', 'solidify_visibility', ModifierName.SOLIDIFY),
+    ('wireframe_thickness', 'Wireframe', 'wireframe_visibility', ModifierName.WIREFRAME),
+)
+
+# Toggle icons indexed by the toggle value.
+_blend_icons = ('IMAGE_RGB', 'IMAGE_RGB_ALPHA')
+_visibility_icons = ('RESTRICT_VIEW_ON', 'RESTRICT_VIEW_OFF')
+
+# Operator identifiers bound once, so draw doesn't go through the class dicts.
+_material_operators = (
+    AddReferenceMaterialOperator.bl_idname,
+    AddRetopoMaterialsOperator.bl_idname,
+    RemoveMaterialsOperator.bl_idname,
+)
+
+_utility_operators = (
+    SortModifiersOperator.bl_idname,
+    MirrorModifierOperator.bl_idname,
+    QuickShrinkwrapOperator.bl_idname,
+    FlipNormalsOperator.bl_idname,
+    PolyStripOperator.bl_idname,
+)
+
 
 class RetopoMatPanel(Panel):
     bl_category = 'RetopoMat'
@@ -31,9 +62,8 @@ class MaterialsPanel(RetopoMatPanel):
     def draw(self, context: Context):
         layout = self.configure_layout()
 
-        layout.operator(AddReferenceMaterialOperator.bl_idname)
-        layout.operator(AddRetopoMaterialsOperator.bl_idname)
-        layout.operator(RemoveMaterialsOperator.bl_idname)
+        for idname in _material_operators:
+            layout.operator(idname)
 
 
 class SettingsPanel(RetopoMatPanel):
@@ -41,57 +71,47 @@ class SettingsPanel(RetopoMatPanel):
     bl_label = 'Settings'
     bl_order = 2
 
+    @classmethod
+    def poll(cls, context: Context) -> bool:
+        # Don't draw at all when our settings aren't registered on the scene.
+        return getattr(context.scene, 'retopomat', None) is not None
+
     def draw(self, context: Context):
         layout = self.configure_layout().column()
 
         object: Object = context.active_object
         settings: 'RetopoMatSettings' = context.scene.retopomat
 
-        reference_material = get_material(object, MaterialName.REFERENCE)
-        retopo_material = get_material(object, MaterialName.RETOPO)
-        displace_modifier = get_modifier(object, ModifierName.DISPLACE)
-        solidify_modifier = get_modifier(object, ModifierName.SOLIDIFY)
-        wireframe_modifier = get_modifier(object, ModifierName.WIREFRAME)
-
-        row = layout.row(align=True)
-        row.enabled = (reference_material is not None)
-        row.prop(settings, 'reference_color', text='Reference')
-        icon = 'IMAGE_RGB_ALPHA' if settings.reference_blend else 'IMAGE_RGB'
-        row.prop(settings, 'reference_blend', text='', icon=icon)
+        # Let the property accessors reuse our object instead of walking bpy.context again.
+        set_panel_object(object)
+        try:
+            self._draw_settings(layout, context, object, settings)
+        finally:
+            set_panel_object(None)
 
-        row = layout.row(align=True)
-        row.enabled = (retopo_material is not None)
-        row.prop(settings, 'retopo_color', text='Retopo')
-        icon = 'IMAGE_RGB_ALPHA' if settings.retopo_blend else 'IMAGE_RGB'
-        row.prop(settings, 'retopo_blend', text='', icon=icon)
+    def _draw_settings(self, layout: UILayout, context: Context, object: Object, settings: 'RetopoMatSettings'):
+        for prop, text, toggle, name in _material_rows:
+            row = layout.row(align=True)
+            row.enabled = (get_material(object, name) is not None)
+            row.prop(settings, prop, text=text)
+            row.prop(settings, toggle, text='', icon=_blend_icons[getattr(settings, toggle)])
 
         layout.separator()
 
-        row = layout.row(align=True)
-        row.enabled = (displace_modifier is not None)
-        row.prop(settings, 'displace_strength', text='Offset')
-        icon = 'RESTRICT_VIEW_OFF' if settings.displace_visibility else 'RESTRICT_VIEW_ON'
-        row.prop(settings, 'displace_visibility', text='', icon=icon)
-
-        row = layout.row(align=True)
-        row.enabled = (solidify_modifier is not None)
-        row.prop(settings, 'solidify_thickness', text='Thickness')
-        icon = 'RESTRICT_VIEW_OFF' if settings.solidify_visibility else 'RESTRICT_VIEW_ON'
-        row.prop(settings, 'solidify_visibility', text='', icon=icon)
+        for prop, text, toggle, name in _modifier_rows:
+            row = layout.row(align=True)
+            row.enabled = (get_modifier(object, name) is not None)
+            row.prop(settings, prop, text=text)
+            row.prop(settings, toggle, text='', icon=_visibility_icons[getattr(settings, toggle)])
 
-        row = layout.row(align=True)
-        row.enabled = (wireframe_modifier is not None)
-        row.prop(settings, 'wireframe_thickness', text='Wireframe')
-        icon = 'RESTRICT_VIEW_OFF' if settings.wireframe_visibility else 'RESTRICT_VIEW_ON'
-        row.prop(settings, 'wireframe_visibility', text='', icon=icon)
+        # There is always exactly one theme, so index instead of searching by name.
+        theme: Theme = context.preferences.themes[0]
 
-        theme: Theme = context.preferences.themes.get('Default')
-        if theme is not None:
-            layout.separator()
+        layout.separator()
 
-            row = layout.row(align=True)
-            row.enabled = (context.mode == 'EDIT_MESH')
-            row.prop(theme.view_3d, 'vertex_size', text='Vertex')
+        row = layout.row(align=True)
+        row.enabled = (context.mode == 'EDIT_MESH')
+        row.prop(theme.view_3d, 'vertex_size', text='Vertex')
 
 
 class UtilitiesPanel(RetopoMatPanel):
@@ -102,11 +122,8 @@ class UtilitiesPanel(RetopoMatPanel):
     def draw(self, context: Context):
         layout = self.configure_layout()
 
-        layout.operator(SortModifiersOperator.bl_idname)
-        layout.operator(MirrorModifierOperator.bl_idname)
-        layout.operator(QuickShrinkwrapOperator.bl_idname)
-        layout.operator(FlipNormalsOperator.bl_idname)
-        layout.operator(PolyStripOperator.bl_idname)
+        for idname in _utility_operators:
+            layout.operator(idname)
 
 
 classes = (
@@ -116,11 +133,4 @@ classes = (
 )
 
 
-def register():
-    for cls in classes:
-        register_class(cls)
-
-
-def unregister():
-    for cls in reversed(classes):
-        unregister_class(cls)
+register, unregister = register_classes_factory(classes)
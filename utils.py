@@ -1,11 +1,11 @@
 from enum import Enum
-from typing import TYPE_CHECKING, List, Tuple, Union
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
 
 import bmesh
 import bpy
 from bmesh.types import BMFace
 from bpy.types import (Context, CorrectiveSmoothModifier, Depsgraph, DisplaceModifier, Material, Mesh, MirrorModifier,
-                       Modifier, Object, Scene, ShaderNode, ShaderNodeBsdfPrincipled, ShaderNodeEmission,
+                       Modifier, NodeSocket, Object, Scene, ShaderNode, ShaderNodeBsdfPrincipled, ShaderNodeEmission,
                        ShaderNodeMixShader, ShaderNodeNewGeometry, ShaderNodeOutputMaterial, ShrinkwrapModifier,
                        SolidifyModifier, UILayout, WireframeModifier)
 
@@ -36,6 +36,33 @@ class ShrinkwrapName:
         return (cls.SHRINKWRAP_TANGENT, cls.CORRECTIVE_SMOOTH, cls.SHRINKWRAP_NEAREST)
 
 
+# Lookup caches keyed by object pointer, cleared whenever the depsgraph reports an update.
+_material_cache: Dict[Tuple[int, MaterialName], Union[Material, None]] = {}
+_modifier_cache: Dict[Tuple[int, ModifierName], Union[Modifier, None]] = {}
+_node_cache: Dict[Tuple[int, str], Union[ShaderNode, None]] = {}
+_socket_index_cache: Dict[Tuple[int, str], int] = {}
+
+# Name constants used to classify objects without scanning per enum member.
+_REFERENCE_PREFIX = MaterialName.REFERENCE.value
+_RETOPO_PREFIXES = (MaterialName.RETOPO.value, MaterialName.WIREFRAME.value)
+_MODIFIER_NAMES = frozenset(name.value for name in ModifierName)
+
+
+# The object the settings panel is currently drawing, so its accessors can skip the context walk.
+_panel_object: List[Union[Object, None]] = [None]
+
+
+def set_panel_object(object: Union[Object, None]):
+    '''Set the object whose settings are being drawn; clear with None when done.'''
+    _panel_object[0] = object
+
+
+def get_panel_object() -> Union[Object, None]:
+    '''Get the object set by the settings panel, falling back to the active object.'''
+    object = _panel_object[0]
+    return object if (object is not None) else bpy.context.active_object
+
+
 def check_context(context: Context) -> bool:
     '''Check whether the current context has write access to ID properties.'''
     try:
@@ -48,6 +75,10 @@ def check_context(context: Context) -> bool:
 
 def get_material(object: Union[Object, None], name: MaterialName, create: bool = False) -> Union[Material, None]:
     '''Get a material with the given name from the given mesh object, create it if necessary.'''
+    key = ((object.as_pointer() if (object is not None) else 0), name)
+    if (not create) and (key in _material_cache):
+        return _material_cache[key]
+
     material = _find_material(object, name)
 
     if material is None:
@@ -72,6 +103,7 @@ def get_material(object: Union[Object, None], name: MaterialName, create: bool =
             else:  # The material is not valid and we can't safely fix it here.
                 material = None
 
+    _material_cache[key] = material
     return material
 
 
@@ -89,14 +121,33 @@ def _find_material(object: Union[Object, None], name: MaterialName) -> Union[Mat
     return None
 
 
+def get_node(material: Material, name: str) -> Union[ShaderNode, None]:
+    '''Get a node with the given name from the given material, using the cache where possible.'''
+    key = (material.as_pointer(), name)
+    if key in _node_cache:
+        return _node_cache[key]
+
+    node = material.node_tree.nodes.get(name)
+
+    _node_cache[key] = node
+    return node
+
+
+def get_node_input(node: ShaderNode, name: str) -> Union[NodeSocket, None]:
+    '''Get an input socket by name, caching its index to avoid the linear search per access.'''
+    key = (node.as_pointer(), name)
+    index = _socket_index_cache.get(key)
+
+    if index is None:
+        index = node.inputs.find(name)
+        _socket_index_cache[key] = index
+
+    return node.inputs[index] if (index != -1) else None
+
+
 def check_material(material: Material, name: MaterialName) -> bool:
     '''Check whether the given material is valid.'''
-    if name is MaterialName.REFERENCE:
-        return _check_reference_material(material)
-    elif name is MaterialName.RETOPO:
-        return _check_retopo_material(material)
-    elif name is MaterialName.WIREFRAME:
-        return _check_wireframe_material(material)
+    return _material_checks[name](material)
 
 
 def _check_reference_material(material: Material) -> bool:
@@ -105,6 +156,8 @@ def _check_reference_material(material: Material) -> bool:
         return False
     elif 'Principled BSDF' not in material.node_tree.nodes:
         return False
+    elif not _check_output_linked(material):
+        return False
 
     return True
 
@@ -115,6 +168,8 @@ def _check_retopo_material(material: Material) -> bool:
         return False
     elif 'Principled BSDF' not in material.node_tree.nodes:
         return False
+    elif not _check_output_linked(material):
+        return False
 
     return True
 
@@ -123,23 +178,34 @@ def _check_wireframe_material(material: Material) -> bool:
     '''Check whether the wireframe material is valid.'''
     if not material.use_nodes:
         return False
+    elif not _check_output_linked(material):
+        return False
 
     return True
 
 
+def _check_output_linked(material: Material) -> bool:
+    '''Check whether the material has an output node with something plugged into its surface.'''
+    node = material.node_tree.nodes.get('Material Output')
+    return (node is not None) and node.inputs['Surface'].is_linked
+
+
+_material_checks = {
+    MaterialName.REFERENCE: _check_reference_material,
+    MaterialName.RETOPO: _check_retopo_material,
+    MaterialName.WIREFRAME: _check_wireframe_material,
+}
+
+
 def setup_material(material: Material, name: MaterialName):
     '''Setup the given material.'''
-    if name is MaterialName.REFERENCE:
-        _setup_reference_material(material)
-    elif name is MaterialName.RETOPO:
-        _setup_retopo_material(material)
-    elif name is MaterialName.WIREFRAME:
-        _setup_wireframe_material(material)
+    # Resolve the settings once, so each setup doesn't cross into RNA for every value.
+    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
+    _material_setups[name](material, settings)
 
 
-def _setup_reference_material(material: Material):
+def _setup_reference_material(material: Material, settings: 'RetopoMatSettings'):
     '''Setup the reference material.'''
-    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
     blend: bool = settings.get_internal('reference_blend')
     color: Tuple[float, float, float, float] = settings.get_internal('reference_color')
 
@@ -148,10 +214,10 @@ def _setup_reference_material(material: Material):
     material.use_backface_culling = False
     material.show_transparent_back = False
     material.use_nodes = True
-    material.node_tree.nodes.clear()
+    _prune_nodes(material, (ShaderNodeOutputMaterial, ShaderNodeBsdfPrincipled))
 
-    output_node = _add_node(material, ShaderNodeOutputMaterial, (0, 0))
-    principled_node = _add_node(material, ShaderNodeBsdfPrincipled, (-300, 0))
+    output_node = _ensure_node(material, ShaderNodeOutputMaterial, (0, 0))
+    principled_node = _ensure_node(material, ShaderNodeBsdfPrincipled, (-300, 0))
 
     _set_defaults(principled_node, {
         'Base Color': color,
@@ -163,9 +229,8 @@ def _setup_reference_material(material: Material):
     material.node_tree.links.new(output_node.inputs['Surface'], principled_node.outputs['BSDF'])
 
 
-def _setup_retopo_material(material: Material):
+def _setup_retopo_material(material: Material, settings: 'RetopoMatSettings'):
     '''Setup the retopo material.'''
-    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
     blend: bool = settings.get_internal('retopo_blend')
     color: Tuple[float, float, float, float] = settings.get_internal('retopo_color')
 
@@ -174,13 +239,14 @@ def _setup_retopo_material(material: Material):
     material.use_backface_culling = False
     material.show_transparent_back = False
     material.use_nodes = True
-    material.node_tree.nodes.clear()
+    _prune_nodes(material, (ShaderNodeOutputMaterial, ShaderNodeMixShader, ShaderNodeNewGeometry,
+                            ShaderNodeBsdfPrincipled, ShaderNodeEmission))
 
-    output_node = _add_node(material, ShaderNodeOutputMaterial, (0, 0))
-    mix_shader_node = _add_node(material, ShaderNodeMixShader, (-200, 0))
-    geometry_node = _add_node(material, ShaderNodeNewGeometry, (-200, 300))
-    principled_node = _add_node(material, ShaderNodeBsdfPrincipled, (-500, 0))
-    emission_node = _add_node(material, ShaderNodeEmission, (-200, -200))
+    output_node = _ensure_node(material, ShaderNodeOutputMaterial, (0, 0))
+    mix_shader_node = _ensure_node(material, ShaderNodeMixShader, (-200, 0))
+    geometry_node = _ensure_node(material, ShaderNodeNewGeometry, (-200, 300))
+    principled_node = _ensure_node(material, ShaderNodeBsdfPrincipled, (-500, 0))
+    emission_node = _ensure_node(material, ShaderNodeEmission, (-200, -200))
 
     _set_defaults(principled_node, {
         'Base Color': color,
@@ -200,9 +266,8 @@ def _setup_retopo_material(material: Material):
     material.node_tree.links.new(mix_shader_node.inputs[2], emission_node.outputs['Emission'])
 
 
-def _setup_wireframe_material(material: Material):
+def _setup_wireframe_material(material: Material, settings: 'RetopoMatSettings'):
     '''Setup the wireframe material.'''
-    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
     blend: bool = settings.get_internal('retopo_blend')
 
     material.blend_method = 'BLEND' if blend else 'OPAQUE'
@@ -210,10 +275,10 @@ def _setup_wireframe_material(material: Material):
     material.use_backface_culling = False
     material.show_transparent_back = False
     material.use_nodes = True
-    material.node_tree.nodes.clear()
+    _prune_nodes(material, (ShaderNodeOutputMaterial, ShaderNodeBsdfPrincipled))
 
-    output_node = _add_node(material, ShaderNodeOutputMaterial, (0, 0))
-    principled_node = _add_node(material, ShaderNodeBsdfPrincipled, (-300, 0))
+    output_node = _ensure_node(material, ShaderNodeOutputMaterial, (0, 0))
+    principled_node = _ensure_node(material, ShaderNodeBsdfPrincipled, (-300, 0))
 
     _set_defaults(principled_node, {
         'Base Color': (0.0, 0.0, 0.0, 1.0),
@@ -225,9 +290,41 @@ def _setup_wireframe_material(material: Material):
     material.node_tree.links.new(output_node.inputs['Surface'], principled_node.outputs['BSDF'])
 
 
-def _add_node(material: Material, node_type: type, location: Tuple[float, float]) -> ShaderNode:
-    '''Create a node of the given type at the given position.'''
-    node = material.node_tree.nodes.new(node_type.__name__)
+_material_setups = {
+    MaterialName.REFERENCE: _setup_reference_material,
+    MaterialName.RETOPO: _setup_retopo_material,
+    MaterialName.WIREFRAME: _setup_wireframe_material,
+}
+
+
+def _prune_nodes(material: Material, node_types: Tuple[type, ...]):
+    '''Remove nodes that aren't of the given types, and duplicates, so the setup result is predictable.'''
+    nodes = material.node_tree.nodes
+    found = set()
+
+    for node in list(nodes):
+        node_type = type(node)
+
+        if (not isinstance(node, node_types)) or (node_type in found):
+            nodes.remove(node)
+        else:
+            found.add(node_type)
+
+
+def _ensure_node(material: Material, node_type: type, location: Tuple[float, float]) -> ShaderNode:
+    '''Find a node of the given type or create one, and give it the default name and position.'''
+    nodes = material.node_tree.nodes
+
+    for node in nodes:
+        if isinstance(node, node_type):
+            break
+    else:
+        node = nodes.new(node_type.__name__)
+
+    # A reused node may be renamed, which would fail the name based checks and lookups.
+    if node.name != node.bl_rna.name:
+        node.name = node.bl_rna.name
+
     node.location = location
     node.select = False
     return node
@@ -243,15 +340,24 @@ def set_materials(object: Object, materials: List[Material]):
     '''Clear materials, then add the given materials.'''
     if (object is not None) and (object.type == 'MESH'):
         data: Mesh = object.data
+        data_materials = data.materials  # Bind locally, so the loop skips the attribute lookup per material.
+
+        # Skip the rebuild when the slots already match, so no depsgraph update is triggered.
+        if list(data_materials) == materials:
+            return
 
-        data.materials.clear()
+        data_materials.clear()
 
         for material in materials:
-            data.materials.append(material)
+            data_materials.append(material)
 
 
 def get_modifier(object: Union[Object, None], name: ModifierName, create: bool = False) -> Union[Modifier, None]:
     '''Get a modifier with the given name from the given mesh object, create it if necessary.'''
+    key = ((object.as_pointer() if (object is not None) else 0), name)
+    if (not create) and (key in _modifier_cache):
+        return _modifier_cache[key]
+
     modifier = _find_modifier(object, name)
 
     if modifier is None:
@@ -265,9 +371,29 @@ def get_modifier(object: Union[Object, None], name: ModifierName, create: bool =
     if (modifier is not None) and create:  # If create is used, always setup the modifier, even if it already existed.
         setup_modifier(modifier, name)
 
+    _modifier_cache[key] = modifier
     return modifier
 
 
+def ensure_modifiers(object: Object, names: List[ModifierName]) -> List[Modifier]:
+    '''Get or create modifiers with the given names on the given mesh object, in a single pass.'''
+    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
+    existing = object.modifiers
+    modifiers = []
+
+    for name in names:
+        modifier = existing.get(name.value)
+
+        if modifier is None:
+            modifier = existing.new(name.value, name.name)
+
+        setup_modifier(modifier, name, settings)
+        _modifier_cache[(object.as_pointer(), name)] = modifier
+        modifiers.append(modifier)
+
+    return modifiers
+
+
 def _find_modifier(object: Union[Object, None], name: ModifierName) -> Union[Modifier, None]:
     '''Try to find the modifier with the given name on the given mesh object.'''
     if (object is not None) and (object.type == 'MESH'):
@@ -277,29 +403,26 @@ def _find_modifier(object: Union[Object, None], name: ModifierName) -> Union[Mod
     return None
 
 
-def setup_modifier(modifier: Modifier, name: ModifierName):
-    '''Setup the given modifier.'''
-    if name == ModifierName.DISPLACE:
-        _setup_displace_modifier(modifier)
-    elif name == ModifierName.SOLIDIFY:
-        _setup_solidify_modifier(modifier)
-    elif name == ModifierName.WIREFRAME:
-        _setup_wireframe_modifier(modifier)
+def setup_modifier(modifier: Modifier, name: ModifierName, settings: 'RetopoMatSettings' = None):
+    '''Setup the given modifier, resolving the settings once unless they're passed in.'''
+    if settings is None:
+        settings = bpy.context.scene.retopomat
+
+    _modifier_setups[name](modifier, settings)
 
 
-def _setup_displace_modifier(modifier: DisplaceModifier):
+def _setup_displace_modifier(modifier: DisplaceModifier, settings: 'RetopoMatSettings'):
     '''Setup the displace modifier.'''
     modifier.show_in_editmode = True
     modifier.show_on_cage = True
     modifier.direction = 'NORMAL'
     modifier.mid_level = 0.0
 
-    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
     modifier.show_viewport = settings.get_internal('displace_visibility')
     modifier.strength = settings.get_internal('displace_strength')
 
 
-def _setup_solidify_modifier(modifier: SolidifyModifier):
+def _setup_solidify_modifier(modifier: SolidifyModifier, settings: 'RetopoMatSettings'):
     '''Setup the solidify modifier.'''
     modifier.show_in_editmode = True
     modifier.show_on_cage = True
@@ -310,12 +433,11 @@ def _setup_solidify_modifier(modifier: SolidifyModifier):
     modifier.material_offset = 1
     modifier.material_offset_rim = 1
 
-    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
     modifier.show_viewport = settings.get_internal('solidify_visibility')
     modifier.thickness = settings.get_internal('solidify_thickness')
 
 
-def _setup_wireframe_modifier(modifier: WireframeModifier):
+def _setup_wireframe_modifier(modifier: WireframeModifier, settings: 'RetopoMatSettings'):
     '''Setup the wireframe modifier.'''
     modifier.show_in_editmode = True
     modifier.show_on_cage = False
@@ -327,11 +449,17 @@ def _setup_wireframe_modifier(modifier: WireframeModifier):
     modifier.use_crease = False
     modifier.material_offset = 1
 
-    settings: 'RetopoMatSettings' = bpy.context.scene.retopomat
     modifier.show_viewport = settings.get_internal('wireframe_visibility')
     modifier.thickness = settings.get_internal('wireframe_thickness')
 
 
+_modifier_setups = {
+    ModifierName.DISPLACE: _setup_displace_modifier,
+    ModifierName.SOLIDIFY: _setup_solidify_modifier,
+    ModifierName.WIREFRAME: _setup_wireframe_modifier,
+}
+
+
 def remove_modifiers(object: Object):
     '''Remove retopo modifiers from the given object.'''
     for name in ModifierName:
@@ -354,11 +482,22 @@ def sort_modifiers(object: Object):
 
 def _move_modifier(object: Object, modifier: Modifier, index: int):
     '''Move the given modifier to the given index.'''
-    try:  # Newer versions of Blender can use modifier_move_to_index.
+    modifiers = object.modifiers
+
+    # Newer versions of Blender can move within the collection, without the operator overhead.
+    if hasattr(modifiers, 'move'):
+        current = modifiers.find(modifier.name)
+
+        if current != index:
+            modifiers.move(current, index)
+
+        return
+
+    try:  # Otherwise try the move to index operator.
         bpy.ops.object.modifier_move_to_index(modifier=modifier.name, index=index)
 
-    except:  # Older versions of Blender have to use modifier_move_down/up.
-        current = object.modifiers.find(modifier.name)
+    except:  # The oldest versions of Blender have to use modifier_move_down/up.
+        current = modifiers.find(modifier.name)
 
         if index > current:
             for _ in range(index - current):
@@ -371,7 +510,7 @@ def _move_modifier(object: Object, modifier: Modifier, index: int):
 
 def get_mirror_modifier(object: Object, create: bool = False) -> Union[MirrorModifier, None]:
     '''Get the first mirror modifier, create one if necessary.'''
-    for modifier in object.modifiers.values():
+    for modifier in object.modifiers:
         if modifier.type == 'MIRROR':
             return modifier
 
@@ -440,11 +579,10 @@ def apply_shrinkwrap(object: Object):
             modifier.show_viewport = False
             original_modifiers.append(modifier)
 
-    # Get an up to date dependency graph.
-    bpy.context.view_layer.update()
-    depsgraph = bpy.context.view_layer.depsgraph
+    # Get an up to date dependency graph, only re-evaluating what is tagged dirty.
+    depsgraph = bpy.context.evaluated_depsgraph_get()
 
-    # Apply our modifiers with bmesh.
+    # Apply our modifiers with bmesh, which carries every data layer across.
     bm = bmesh.new()
     bm.from_object(object, depsgraph)
     bm.to_mesh(object.data)
@@ -489,65 +627,104 @@ def flip_normals(object: Object):
     if object.mode == 'EDIT':
         bm = bmesh.from_edit_mesh(data)
 
+        # The mesh arrays are stale in edit mode, so check the bmesh for faces instead.
+        if not len(bm.faces):
+            return
+
         faces: List[BMFace] = bm.faces
         selected = [face for face in faces if face.select]
-        selected = selected if selected else faces
+        selected = selected if selected else faces[:]
 
-        for face in selected:
-            face.normal_flip()
+        # One C call for all faces, instead of one Python call per face.
+        bmesh.ops.reverse_faces(bm, faces=selected)
 
-        bmesh.update_edit_mesh(data)
+        # Flipping only changes winding, so skip re-tessellation and keep the mesh non-destructive.
+        bmesh.update_edit_mesh(data, loop_triangles=False, destructive=False)
 
     else:
-        bm = bmesh.new(use_operators=False)
-        bm.from_mesh(data)
+        # Nothing to flip, so don't build a bmesh or trigger a depsgraph update.
+        if not len(data.polygons):
+            return
 
-        faces: List[BMFace] = bm.faces
+        bm = bmesh.new()
+        bm.from_mesh(data)
 
-        for face in faces:
-            face.normal_flip()
+        bmesh.ops.reverse_faces(bm, faces=bm.faces[:])
 
         bm.to_mesh(data)
         data.update()
 
 
+# Whether layout.row accepts heading; probed on the first call instead of per call.
+_heading_supported: Union[bool, None] = None
+
+
 def row_with_heading(layout: UILayout, heading: str, align: bool = False) -> UILayout:
     '''Make a row with heading, also works in older versions of Blender.'''
+    global _heading_supported
+
     # Newer versions of Blender can use heading.
-    try:
+    if _heading_supported is None:
+        try:
+            row = layout.row(heading=heading, align=align)
+            _heading_supported = True
+            return row
+        except TypeError:
+            _heading_supported = False
+
+    if _heading_supported:
         return layout.row(heading=heading, align=align)
 
     # Older versions of Blender have to use split.
-    except:
-        split = layout.row().split()
-        split.use_property_split = False
-        split.use_property_decorate = True
+    split = layout.row().split()
+    split.use_property_split = False
+    split.use_property_decorate = True
 
-        left = split.row()
-        left.alignment = 'RIGHT'
-        left.label(text=heading)
+    left = split.row()
+    left.alignment = 'RIGHT'
+    left.label(text=heading)
 
-        right = split.row(align=align)
-        right.alignment = 'EXPAND'
-        return right
+    right = split.row(align=align)
+    right.alignment = 'EXPAND'
+    return right
 
 
 @bpy.app.handlers.persistent
 def update_handler(scene: Scene, depsgraph: Depsgraph):
+    # Bail out cheaply when nothing we track changed, which covers most depsgraph updates.
+    if not (depsgraph.id_type_updated('OBJECT') or depsgraph.id_type_updated('MATERIAL')
+            or depsgraph.id_type_updated('NODETREE')):
+        return
+
+    # Any such change can invalidate the cached lookups.
+    _material_cache.clear()
+    _modifier_cache.clear()
+    _node_cache.clear()
+    _socket_index_cache.clear()
+
     object: Object = depsgraph.view_layer.objects.active
 
     # Update the stored reference or retopo object with the active mesh object.
     if (object is not None) and (object.type == 'MESH'):
         settings: 'RetopoMatSettings' = scene.retopomat
+        data: Mesh = object.data
+
+        # Classify the materials in a single pass instead of one scan per name.
+        has_reference = has_retopo = False
+        for material in data.materials:
+            if material is None:
+                continue
+            elif material.name.startswith(_REFERENCE_PREFIX):
+                has_reference = True
+            elif material.name.startswith(_RETOPO_PREFIXES):
+                has_retopo = True
 
         # If an object has the reference material, it is a reference object.
-        if _find_material(object, MaterialName.REFERENCE):
+        if has_reference:
             settings.reference_object = object
 
         # If an object has any of the retopo materials or modifiers, it is a retopo object.
-        elif any(_find_material(object, name) for name in (MaterialName.RETOPO, MaterialName.WIREFRAME)):
-            settings.retopo_object = object
-        elif any(_find_modifier(object, name) for name in ModifierName):
+        elif has_retopo or not _MODIFIER_NAMES.isdisjoint(object.modifiers.keys()):
             settings.retopo_object = object
 
 
@@ -557,3 +734,8 @@ def register():
 
 def unregister():
     bpy.app.handlers.depsgraph_update_post.remove(update_handler)
+
+    _material_cache.clear()
+    _modifier_cache.clear()
+    _node_cache.clear()
+    _socket_index_cache.clear()